@@ -23,6 +23,28 @@ CLOUD_DATABASE_URL = os.getenv("CLOUD_DATABASE_URL")
 
 app = Flask(__name__)
 
+# Off-thread log formatting (QueueHandler -> background QueueListener)
+from ml_engine.core.log import setup_queue_logging
+setup_queue_logging()
+
+# Shared pooled engine for Cloud DB reads; the helpers below used to
+# build a fresh engine (and connection pool) on every call.
+_cloud_engine = None
+_cloud_engine_lock = threading.Lock()
+
+def get_cloud_engine():
+    global _cloud_engine
+    if _cloud_engine is None:
+        with _cloud_engine_lock:
+            if _cloud_engine is None:
+                _cloud_engine = create_engine(CLOUD_DATABASE_URL, pool_pre_ping=True)
+    return _cloud_engine
+
+# Dashboard fanout: independent Cloud DB reads run concurrently so page
+# latency is the slowest query instead of the sum of all of them.
+from concurrent.futures import ThreadPoolExecutor
+_db_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="db-fanout")
+
 # Global status for long-running scripts (Added 'login')
 script_status = {
     "login": {"status": "idle", "output": ""},
@@ -37,7 +59,7 @@ def get_top_20():
     if not CLOUD_DATABASE_URL:
         return []
     try:
-        engine = create_engine(CLOUD_DATABASE_URL)
+        engine = get_cloud_engine()
         with engine.connect() as conn:
             # Query with dynamic accuracy, target percentage, and current price/days
             query = text("""
@@ -75,7 +97,7 @@ def get_top_20_1d():
     if not CLOUD_DATABASE_URL:
         return []
     try:
-        engine = create_engine(CLOUD_DATABASE_URL)
+        engine = get_cloud_engine()
         with engine.connect() as conn:
             # Query for 1D predictions with correct columns from predictions_1d
             query = text("""
@@ -103,7 +125,7 @@ def get_last_fetch():
     if not CLOUD_DATABASE_URL:
         return None
     try:
-        engine = create_engine(CLOUD_DATABASE_URL)
+        engine = get_cloud_engine()
         with engine.connect() as conn:
             query = text("SELECT MAX(ts) FROM stock_history")
             result = conn.execute(query).scalar()
@@ -119,8 +141,10 @@ def get_last_fetch():
 def dashboard():
     token = os.getenv("KITE_ACCESS_TOKEN")
     status = "Active" if token else "Expired/Missing"
-    top_20 = get_top_20()
-    last_fetch = get_last_fetch()
+    top_20_future = _db_executor.submit(get_top_20)
+    last_fetch_future = _db_executor.submit(get_last_fetch)
+    top_20 = top_20_future.result()
+    last_fetch = last_fetch_future.result()
     
     # Extract Market Regime from the first stock (it's global)
     market_regime = top_20[0]['market_regime'] if top_20 and 'market_regime' in top_20[0] else "Unknown"
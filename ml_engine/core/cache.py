@@ -49,4 +49,5 @@ class TTLCache:
             self._cache.clear()
 
 stock_cache = TTLCache(maxsize=1000, ttl=300)
-ticker_cache = TTLCache(maxsize=10, ttl=60)
+ticker_cache = TTLCache(maxsize=10, ttl=5)
+indices_cache = TTLCache(maxsize=1, ttl=30)
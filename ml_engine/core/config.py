@@ -28,6 +28,9 @@ def get_access_token():
     return os.getenv("KITE_ACCESS_TOKEN")
 
 DATABASE_URL = env("DATABASE_URL")
+# Optional read replica for the read-only query paths; falls back to the
+# primary when unset.
+DATABASE_URL_REPLICA = env("DATABASE_URL_REPLICA")
 JWT_SECRET = env("JWT_SECRET", "supersecretkeychangeit")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
@@ -1,24 +1,60 @@
 
+import logging
 import smtplib
+
+import jinja2
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from ml_engine.core.config import env
 
+log = logging.getLogger(__name__)
+
+# Templates are compiled once at import (auto_reload off) so each send only
+# pays for render, not parse. Callers pass the prerendered HTML to send_email.
+_JINJA_ENV = jinja2.Environment(autoescape=True, auto_reload=False, cache_size=400)
+
+_ALERT_TEMPLATE = _JINJA_ENV.from_string(
+    """
+    <html>
+    <body style="font-family: sans-serif; background: #0f172a; color: #e2e8f0; padding: 24px;">
+        <h2 style="color: #22c55e;">{{ title }}</h2>
+        <p>{{ message }}</p>
+        {% if symbol %}
+        <p><b>{{ symbol }}</b>{% if score is not none %} — OMRE Score: {{ score }}{% endif %}</p>
+        {% endif %}
+        <p style="color: #94a3b8; font-size: 0.8rem;">Sent by the Kite data dashboard.</p>
+    </body>
+    </html>
+    """
+)
+
+
+def render_alert_email(title: str, message: str, symbol: str | None = None, score: float | None = None) -> str:
+    """Render the precompiled alert template to an HTML string."""
+    return _ALERT_TEMPLATE.render(title=title, message=message, symbol=symbol, score=score)
+
+
 SMTP_HOST = env("SMTP_HOST", "smtp.gmail.com")
 SMTP_PORT = int(env("SMTP_PORT", "587"))
 SMTP_USER = env("SMTP_USER")
 SMTP_PASSWORD = env("SMTP_PASSWORD")
 FROM_EMAIL = env("FROM_EMAIL", SMTP_USER)
 
-def send_email(to_email: str, subject: str, html_content: str) -> bool:
+# Resolved once at import: when SMTP is not configured, send_email is bound
+# to a no-op so callers pay a single function call instead of re-checking
+# credentials (and building the MIME payload) on every send.
+_SMTP_ENABLED = bool(SMTP_USER and SMTP_PASSWORD)
+
+
+def _send_email_disabled(to_email: str, subject: str, html_content: str) -> bool:
+    return False
+
+
+def _send_email_smtp(to_email: str, subject: str, html_content: str) -> bool:
     """
     Send an email via SMTP.
     Returns True if successful, False otherwise.
     """
-    if not SMTP_USER or not SMTP_PASSWORD:
-        print("⚠️ SMTP credentials not set. Email skipped.")
-        return False
-
     try:
         msg = MIMEMultipart()
         msg["From"] = FROM_EMAIL
@@ -27,15 +63,22 @@ def send_email(to_email: str, subject: str, html_content: str) -> bool:
 
         msg.attach(MIMEText(html_content, "html"))
 
-        print(f"📧 Sending email to {to_email} via {SMTP_HOST}:{SMTP_PORT}...")
-        
+        log.info("Sending email to %s via %s:%s...", to_email, SMTP_HOST, SMTP_PORT)
+
         with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
             server.starttls()
             server.login(SMTP_USER, SMTP_PASSWORD)
             server.send_message(msg)
-            
-        print("✅ Email sent successfully.")
+
+        log.info("Email sent successfully.")
         return True
-    except Exception as e:
-        print(f"❌ Failed to send email: {e}")
+    except Exception:
+        log.error("Failed to send email to %s", to_email, exc_info=True)
         return False
+
+
+if _SMTP_ENABLED:
+    send_email = _send_email_smtp
+else:
+    log.warning("SMTP credentials not set. Emails will be skipped.")
+    send_email = _send_email_disabled
@@ -6,14 +6,27 @@ class RateLimiter:
     def __init__(self, max_per_second: float):
         if max_per_second <= 0:
             raise ValueError("max_per_second must be > 0")
-        self._min_interval = 1.0 / max_per_second
-        self._lock = threading.Lock()
-        self._last = 0.0
+        self._rate = max_per_second
+        # Bucket capacity of one token: callers stay evenly spaced at
+        # 1/rate apart with no startup or post-idle burst, matching what
+        # the Kite per-second ceiling actually tolerates.
+        self._max_tokens = 1.0
+        self._tokens = 1.0
+        self._last = time.monotonic()
+        self._cv = threading.Condition()
 
     def wait(self) -> None:
-        with self._lock:
-            now = time.monotonic()
-            wait_for = self._min_interval - (now - self._last)
-            if wait_for > 0:
-                time.sleep(wait_for)
-            self._last = time.monotonic()
+        # Token bucket refilled from time.monotonic() deltas under a single
+        # condition variable: each waiter sleeps via cv.wait(timeout) for
+        # exactly the refill time it still needs, instead of every thread
+        # polling time.sleep in its own loop.
+        with self._cv:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._max_tokens, self._tokens + (now - self._last) * self._rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self._cv.notify()
+                    return
+                self._cv.wait(timeout=(1.0 - self._tokens) / self._rate)
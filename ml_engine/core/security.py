@@ -1,9 +1,14 @@
-from datetime import datetime, timedelta
+import time
+from datetime import timedelta
 from typing import Any, Union
 import bcrypt
-from jose import jwt
+from jose import jwk, jwt
 from ml_engine.core.config import JWT_SECRET, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 
+# Construct the HMAC key object once; jwt.encode() accepts it directly and
+# skips re-deriving key material on every token mint.
+_SIGNING_KEY = jwk.construct(JWT_SECRET, ALGORITHM)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain password against a hashed one.
@@ -12,11 +17,16 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     hashed_bytes = hashed_password.encode('utf-8')
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
-def get_password_hash(password: str) -> str:
+def get_password_hash(password: str, rounds: int = 12) -> str:
     """
     Hash a password for the first time.
+
+    User-supplied passwords must keep the default 12+ rounds. Callers
+    hashing high-entropy random secrets (API tokens, session keys) may
+    pass rounds=4 — brute force is already infeasible for 256-bit input,
+    so the extra Blowfish rounds only burn CPU.
     """
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
@@ -24,10 +34,12 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
     """
     Generate a JWT access token.
     """
+    # JWT exp is a Unix timestamp (RFC 7519); integer math avoids the
+    # datetime/timedelta allocations and the deprecated utcnow().
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expires_seconds = int(expires_delta.total_seconds())
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=ALGORITHM)
+        expires_seconds = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    to_encode = {"exp": int(time.time()) + expires_seconds, "sub": str(subject)}
+    encoded_jwt = jwt.encode(to_encode, _SIGNING_KEY, algorithm=ALGORITHM)
     return encoded_jwt
@@ -1,28 +1,90 @@
 from __future__ import annotations
 import datetime as dt
-from sqlalchemy import text
+import io
+import numpy as np
+from sqlalchemy import ARRAY, Text, bindparam, text
 from sqlalchemy.engine import Engine
-from ml_engine.db.schema import init_db
+from sqlalchemy.exc import ProgrammingError
+from ml_engine.core.cache import indices_cache, ticker_cache
+from ml_engine.db.schema import ensure_latest_predictions
+
+# Batches at or above this size go through COPY into a staging table
+# instead of a multi-VALUES INSERT; COPY bypasses per-row parse/bind
+# overhead and is the fastest Postgres ingestion path.
+_COPY_MIN_ROWS = 1000
+
+_HISTORY_COLS = (
+    "instrument_token", "ts", "interval",
+    "open", "high", "low", "close", "volume", "oi",
+)
+
+
+def _normalize_ts(ts):
+    if isinstance(ts, dt.date) and not isinstance(ts, dt.datetime):
+        return dt.datetime(ts.year, ts.month, ts.day, tzinfo=dt.timezone.utc)
+    return ts
+
+
+def _copy_stock_history(conn, rows: list[tuple]) -> int:
+    """COPY rows into a temp staging table, then merge with ON CONFLICT DO NOTHING.
+
+    Rows are positional tuples in _HISTORY_COLS order.
+    """
+    buf = io.StringIO()
+    for r in rows:
+        buf.write("\t".join("\\N" if v is None else str(v) for v in r))
+        buf.write("\n")
+    buf.seek(0)
+
+    cols = ", ".join(_HISTORY_COLS)
+    cursor = conn.connection.cursor()
+    cursor.execute(
+        "CREATE TEMP TABLE stock_history_stage (LIKE stock_history INCLUDING DEFAULTS) ON COMMIT DROP;"
+    )
+    cursor.copy_expert(f"COPY stock_history_stage ({cols}) FROM STDIN", buf)
+    cursor.execute(
+        f"""
+        INSERT INTO stock_history ({cols})
+        SELECT {cols} FROM stock_history_stage
+        ON CONFLICT (instrument_token, ts, interval) DO NOTHING;
+        """
+    )
+    return int(cursor.rowcount or 0)
+
+# Statements with constant SQL are built once at import so per-call
+# text() construction and bind-metadata parsing stay off the hot paths.
+_SQL_UPSERT_STOCK_MASTER = text(
+    """
+    INSERT INTO stock_master (
+      instrument_token, tradingsymbol, name, exchange, last_updated_at
+    ) VALUES (
+      :instrument_token, :tradingsymbol, :name, :exchange, NOW()
+    )
+    ON CONFLICT (instrument_token) DO UPDATE SET
+      tradingsymbol = EXCLUDED.tradingsymbol,
+      name = EXCLUDED.name,
+      exchange = EXCLUDED.exchange,
+      last_updated_at = NOW();
+    """
+)
+
+_SQL_UPSERT_STOCK_HISTORY = text(
+    """
+    INSERT INTO stock_history (
+      instrument_token, ts, interval, open, high, low, close, volume, oi
+    ) VALUES (
+      :instrument_token, :ts, :interval, :open, :high, :low, :close, :volume, :oi
+    )
+    ON CONFLICT (instrument_token, ts, interval) DO NOTHING;
+    """
+)
+
 
 def upsert_stock_master(engine: Engine, rows: list[dict]) -> int:
     if not rows:
         return 0
-    sql = text(
-        """
-        INSERT INTO stock_master (
-          instrument_token, tradingsymbol, name, exchange, last_updated_at
-        ) VALUES (
-          :instrument_token, :tradingsymbol, :name, :exchange, NOW()
-        )
-        ON CONFLICT (instrument_token) DO UPDATE SET
-          tradingsymbol = EXCLUDED.tradingsymbol,
-          name = EXCLUDED.name,
-          exchange = EXCLUDED.exchange,
-          last_updated_at = NOW();
-        """
-    )
     with engine.begin() as conn:
-        result = conn.execute(sql, rows)
+        result = conn.execute(_SQL_UPSERT_STOCK_MASTER, rows)
     return int(getattr(result, "rowcount", 0) or 0)
 
 def upsert_stock_history(
@@ -35,87 +97,109 @@ def upsert_stock_history(
     if not candles:
         return 0
 
+    if len(candles) >= _COPY_MIN_ROWS:
+        # The COPY path takes positional tuples straight from Kite's candle
+        # dicts — no intermediate 9-key dict per row. Missing fields become
+        # NULL, matching the executemany path below.
+        tuples = [
+            (
+                instrument_token,
+                _normalize_ts(c.get("date")),
+                interval,
+                c.get("open"),
+                c.get("high"),
+                c.get("low"),
+                c.get("close"),
+                c.get("volume"),
+                c.get("oi"),
+            )
+            for c in candles
+        ]
+        with engine.begin() as conn:
+            return _copy_stock_history(conn, tuples)
 
-    rows: list[dict] = []
-    for c in candles:
-        ts = c.get("date")
-        if isinstance(ts, dt.date) and not isinstance(ts, dt.datetime):
-            ts = dt.datetime(ts.year, ts.month, ts.day, tzinfo=dt.timezone.utc)
-        rows.append(
-            {
-                "instrument_token": instrument_token,
-                "ts": ts,
-                "interval": interval,
-                "open": c.get("open"),
-                "high": c.get("high"),
-                "low": c.get("low"),
-                "close": c.get("close"),
-                "volume": c.get("volume"),
-                "oi": c.get("oi"),
-            }
-        )
-
-    sql = text(
-        """
-        INSERT INTO stock_history (
-          instrument_token, ts, interval, open, high, low, close, volume, oi
-        ) VALUES (
-          :instrument_token, :ts, :interval, :open, :high, :low, :close, :volume, :oi
-        )
-        ON CONFLICT (instrument_token, ts, interval) DO NOTHING;
-        """
-    )
+    rows = [
+        {
+            "instrument_token": instrument_token,
+            "ts": _normalize_ts(c.get("date")),
+            "interval": interval,
+            "open": c.get("open"),
+            "high": c.get("high"),
+            "low": c.get("low"),
+            "close": c.get("close"),
+            "volume": c.get("volume"),
+            "oi": c.get("oi"),
+        }
+        for c in candles
+    ]
 
     with engine.begin() as conn:
-        result = conn.execute(sql, rows)
+        result = conn.execute(_SQL_UPSERT_STOCK_HISTORY, rows)
     return int(getattr(result, "rowcount", 0) or 0)
 
 
+_SQL_ALL_STOCKS = text(
+    """
+    SELECT instrument_token, tradingsymbol, name, exchange, last_updated_at
+    FROM stock_master
+    ORDER BY tradingsymbol
+    LIMIT :limit OFFSET :offset;
+    """
+)
+
+
 def get_all_stocks(engine: Engine, limit: int = 100, offset: int = 0) -> list[dict]:
     """Fetch all stocks from stock_master with pagination."""
-    sql = text(
-        """
-        SELECT instrument_token, tradingsymbol, name, exchange, last_updated_at
-        FROM stock_master
-        ORDER BY tradingsymbol
-        LIMIT :limit OFFSET :offset;
-        """
-    )
     with engine.begin() as conn:
-        result = conn.execute(sql, {"limit": limit, "offset": offset})
-        return [dict(row._mapping) for row in result]
+        result = conn.execute(_SQL_ALL_STOCKS, {"limit": limit, "offset": offset})
+        # RowMapping already implements the dict interface; skip the
+        # per-row dict copy.
+        return result.mappings().all()
+
+
+_SQL_STOCK_BY_SYMBOL = text(
+    """
+    SELECT
+        sm.instrument_token,
+        sm.tradingsymbol,
+        sm.name,
+        sm.exchange,
+        sm.last_updated_at,
+        sh.close as current_price
+    FROM stock_master sm
+    LEFT JOIN LATERAL (
+        SELECT close
+        FROM stock_history
+        WHERE instrument_token = sm.instrument_token
+          AND interval = 'day'
+        ORDER BY ts DESC
+        LIMIT 1
+    ) sh ON TRUE
+    WHERE UPPER(sm.tradingsymbol) = UPPER(:symbol)
+    LIMIT 1;
+    """
+)
 
 
 def get_stock_by_symbol(engine: Engine, symbol: str) -> dict | None:
     """Fetch a single stock by its trading symbol with latest price."""
-    sql = text(
-        """
-        SELECT 
-            sm.instrument_token, 
-            sm.tradingsymbol, 
-            sm.name, 
-            sm.exchange, 
-            sm.last_updated_at,
-            sh.close as current_price
-        FROM stock_master sm
-        LEFT JOIN LATERAL (
-            SELECT close
-            FROM stock_history
-            WHERE instrument_token = sm.instrument_token
-              AND interval = 'day'
-            ORDER BY ts DESC
-            LIMIT 1
-        ) sh ON TRUE
-        WHERE UPPER(sm.tradingsymbol) = UPPER(:symbol)
-        LIMIT 1;
-        """
-    )
     with engine.begin() as conn:
-        result = conn.execute(sql, {"symbol": symbol})
+        result = conn.execute(_SQL_STOCK_BY_SYMBOL, {"symbol": symbol})
         row = result.fetchone()
         return dict(row._mapping) if row else None
 
 
+_SQL_STOCK_HISTORY = text(
+    """
+    SELECT ts, open, high, low, close, volume, oi
+    FROM stock_history
+    WHERE instrument_token = :instrument_token AND interval = :interval
+    ORDER BY ts DESC
+    LIMIT :limit;
+    """
+)
+
+
 def get_stock_history(
     engine: Engine,
     instrument_token: int,
@@ -123,51 +207,77 @@ def get_stock_history(
     limit: int = 100,
 ) -> list[dict]:
     """Fetch OHLC candle data for a stock."""
-    sql = text(
-        """
-        SELECT ts, open, high, low, close, volume, oi
-        FROM stock_history
-        WHERE instrument_token = :instrument_token AND interval = :interval
-        ORDER BY ts DESC
-        LIMIT :limit;
-        """
-    )
     with engine.begin() as conn:
         result = conn.execute(
-            sql,
+            _SQL_STOCK_HISTORY,
             {"instrument_token": instrument_token, "interval": interval, "limit": limit},
         )
-        return [dict(row._mapping) for row in result]
+        return result.mappings().all()
+
+
+_SQL_SEARCH_STOCKS = text(
+    """
+    SELECT
+        sm.instrument_token,
+        sm.tradingsymbol,
+        sm.name,
+        sm.exchange,
+        sm.is_stable,
+        sh.close as current_price
+    FROM stock_master sm
+    LEFT JOIN LATERAL (
+        SELECT close
+        FROM stock_history
+        WHERE instrument_token = sm.instrument_token
+          AND interval = 'day'
+        ORDER BY ts DESC
+        LIMIT 1
+    ) sh ON TRUE
+    WHERE sm.tradingsymbol ILIKE :query OR sm.name ILIKE :query
+    ORDER BY sm.tradingsymbol
+    LIMIT :limit;
+    """
+)
 
 
 def search_stocks(engine: Engine, query: str, limit: int = 20) -> list[dict]:
     """Search stocks by symbol or name with latest price."""
-    sql = text(
-        """
-        SELECT 
-            sm.instrument_token, 
-            sm.tradingsymbol, 
-            sm.name, 
-            sm.exchange, 
-            sm.is_stable,
-            sh.close as current_price
-        FROM stock_master sm
-        LEFT JOIN LATERAL (
-            SELECT close
-            FROM stock_history
-            WHERE instrument_token = sm.instrument_token
-              AND interval = 'day'
-            ORDER BY ts DESC
-            LIMIT 1
-        ) sh ON TRUE
-        WHERE UPPER(sm.tradingsymbol) LIKE UPPER(:query) OR UPPER(sm.name) LIKE UPPER(:query)
-        ORDER BY sm.tradingsymbol
-        LIMIT :limit;
-        """
-    )
     with engine.begin() as conn:
-        result = conn.execute(sql, {"query": f"%{query}%", "limit": limit})
-        return [dict(row._mapping) for row in result]
+        result = conn.execute(_SQL_SEARCH_STOCKS, {"query": f"%{query}%", "limit": limit})
+        return result.mappings().all()
+
+
+# One row per instrument with price/change/pct computed in SQL: LAG()
+# pairs each close with the prior day's close, DISTINCT ON keeps only
+# the newest row. The ts window prunes the index scan to recent days.
+_SQL_TICKER_HISTORY = text("""
+    WITH resolved AS (
+        SELECT instrument_token, tradingsymbol
+        FROM stock_master
+        WHERE UPPER(tradingsymbol) = ANY(:syms)
+    ),
+    recent AS (
+        SELECT h.instrument_token, h.ts, h.close,
+               LAG(h.close) OVER (PARTITION BY h.instrument_token ORDER BY h.ts) AS prev_close
+        FROM stock_history h
+        WHERE h.instrument_token IN (SELECT instrument_token FROM resolved)
+          AND h.interval = 'day'
+          AND h.ts >= NOW() - INTERVAL '30 days'
+    )
+    SELECT DISTINCT ON (rec.instrument_token)
+           rec.instrument_token,
+           res.tradingsymbol,
+           COALESCE(rec.close, 0) AS price,
+           ROUND((rec.close - COALESCE(rec.prev_close, rec.close))::numeric, 2) AS change,
+           ROUND(CASE WHEN COALESCE(rec.prev_close, rec.close) <> 0
+                      THEN ((rec.close - COALESCE(rec.prev_close, rec.close))
+                            / COALESCE(rec.prev_close, rec.close) * 100)::numeric
+                      ELSE 0 END, 2) AS change_percent,
+           (rec.close - COALESCE(rec.prev_close, rec.close)) >= 0 AS is_up
+    FROM recent rec
+    JOIN resolved res USING (instrument_token)
+    ORDER BY rec.instrument_token, rec.ts DESC;
+""").bindparams(bindparam("syms", type_=ARRAY(Text)))
 
 
 def get_ticker_data(engine: Engine, symbols: list[str]) -> list[dict]:
@@ -178,186 +288,305 @@ def get_ticker_data(engine: Engine, symbols: list[str]) -> list[dict]:
     if not symbols:
         return []
 
-    sym_map = {}
-    tokens = []
-    
     clean_symbols = [s.upper() for s in symbols]
-    
-    bind_params = {f"s{i}": s for i, s in enumerate(clean_symbols)}
-    bind_clause = ", ".join([f":s{i}" for i in range(len(clean_symbols))])
-    
-    sql_tokens = text(f"""
-        SELECT instrument_token, tradingsymbol 
-        FROM stock_master 
-        WHERE UPPER(tradingsymbol) IN ({bind_clause})
-    """)
-    
-    with engine.connect() as conn:
-        res_tokens = conn.execute(sql_tokens, bind_params).fetchall()
-        for r in res_tokens:
-            sym_map[r.instrument_token] = r.tradingsymbol
-            tokens.append(r.instrument_token)
 
-    if not tokens:
-        return []
+    cache_key = ",".join(sorted(clean_symbols))
+    cached = ticker_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    token_str = ",".join(map(str, tokens))
-    
-    # Optimized: Use LATERAL join pattern instead of ROW_NUMBER to avoid OOM
-    # This fetches only last 2 rows per token efficiently
-    sql_history = text(f"""
-        SELECT t.instrument_token, h.ts, h.close
-        FROM (SELECT unnest(ARRAY[{token_str}]::bigint[]) as instrument_token) t
-        CROSS JOIN LATERAL (
-            SELECT ts, close
-            FROM stock_history
-            WHERE instrument_token = t.instrument_token
-              AND interval = 'day'
-            ORDER BY ts DESC
-            LIMIT 2
-        ) h;
-    """)
-    
     with engine.connect() as conn:
-        rows = conn.execute(sql_history).fetchall()
+        rows = conn.execute(_SQL_TICKER_HISTORY, {"syms": clean_symbols}).fetchall()
+
+    results = [
+        {
+            "symbol": r.tradingsymbol,
+            "price": r.price,
+            "change": float(r.change or 0),
+            "changePercent": float(r.change_percent or 0),
+            "isUp": bool(r.is_up),
+        }
+        for r in rows
+    ]
+    ticker_cache.set(cache_key, results)
+    return results
 
-    grouped_data = {}
-    for r in rows:
-        tok = r.instrument_token
-        if tok not in grouped_data:
-            grouped_data[tok] = []
-        grouped_data[tok].append(r)
 
-    results = []
-    for tok, candles in grouped_data.items():
-        symbol = sym_map.get(tok)
-        if not symbol:
-            continue
-            
-        candles.sort(key=lambda x: x.ts, reverse=True)
-        
-        latest = candles[0] if candles else None
-        prev = candles[1] if len(candles) > 1 else None
-        
-        price = latest.close if latest else 0.0
-        prev_close = prev.close if prev else price # fallback if no history
-        
-        change = price - prev_close
-        pct = (change / prev_close * 100) if prev_close else 0.0
-        
-        results.append({
-            "symbol": symbol,
-            "price": price,
-            "change": round(change, 2),
-            "changePercent": round(pct, 2),
-            "isUp": change >= 0
-        })
-        
-    return results
+_SQL_STOCK_INDICATORS = text("""
+    SELECT
+        ts,
+        close,
+        rsi_14,
+        ema_50_div,
+        ema_200_div,
+        atr_14_norm,
+        rvol,
+        log_return,
+        adx_14,
+        rel_strength,
+        bb_width,
+        dist_52wh,
+        momentum_strength,
+        panic_buy_signal,
+        ema_50_zscore,
+        trend_regime,
+        is_breakout
+    FROM stock_history
+    WHERE instrument_token = :instrument_token
+      AND interval = 'day'
+      AND rsi_14 IS NOT NULL
+    ORDER BY ts DESC
+    LIMIT 1;
+""")
 
 
 def get_stock_indicators(engine: Engine, instrument_token: int) -> dict | None:
     """Fetch the latest technical indicators for a stock from DB."""
-    sql = text("""
-        SELECT 
-            ts,
-            close,
-            rsi_14,
-            ema_50_div,
-            ema_200_div,
-            atr_14_norm,
-            rvol,
-            log_return,
-            adx_14,
-            rel_strength,
-            bb_width,
-            dist_52wh,
-            momentum_strength,
-            panic_buy_signal,
-            ema_50_zscore,
-            trend_regime,
-            is_breakout
-        FROM stock_history
-        WHERE instrument_token = :instrument_token 
-          AND interval = 'day'
-          AND rsi_14 IS NOT NULL
-        ORDER BY ts DESC
-        LIMIT 1;
-    """)
     with engine.connect() as conn:
-        result = conn.execute(sql, {"instrument_token": instrument_token})
+        result = conn.execute(_SQL_STOCK_INDICATORS, {"instrument_token": instrument_token})
         row = result.fetchone()
         if not row:
             return None
         return dict(row._mapping)
 
 
+def _sanitize_rows(rows: list[dict]) -> list[dict]:
+    """Replace NaN/Inf floats with None so rows JSON-serialize cleanly.
+
+    Checks all float cells with a single np.isfinite pass instead of
+    per-cell math.isnan/math.isinf calls in a Python loop.
+    """
+    if not rows:
+        return rows
+    cells = [
+        (row, key)
+        for row in rows
+        for key, value in row.items()
+        if isinstance(value, float)
+    ]
+    if not cells:
+        return rows
+    values = np.fromiter(
+        (row[key] for row, key in cells), dtype=np.float64, count=len(cells)
+    )
+    for (row, key), ok in zip(cells, np.isfinite(values)):
+        if not ok:
+            row[key] = None
+    return rows
+
+
+_SQL_STOCK_FUNDAMENTALS = text("""
+    SELECT
+        instrument_token,
+        tradingsymbol,
+        debt_to_equity,
+        promoter_holding,
+        roe,
+        pe_ratio,
+        market_cap,
+        book_value,
+        dividend_yield,
+        profit_margin,
+        current_ratio,
+        revenue_growth,
+        updated_at
+    FROM stock_fundamentals
+    WHERE instrument_token = :instrument_token
+    LIMIT 1;
+""")
+
+
 def get_stock_fundamentals(engine: Engine, instrument_token: int) -> dict | None:
     """Fetch fundamental metrics (D/E, ROE, P/E, etc.) for a stock from DB."""
-    import math
-    
-    sql = text("""
-        SELECT 
-            instrument_token,
-            tradingsymbol,
-            debt_to_equity,
-            promoter_holding,
-            roe,
-            pe_ratio,
-            market_cap,
-            book_value,
-            dividend_yield,
-            profit_margin,
-            current_ratio,
-            revenue_growth,
-            updated_at
-        FROM stock_fundamentals
-        WHERE instrument_token = :instrument_token
-        LIMIT 1;
-    """)
     with engine.connect() as conn:
-        result = conn.execute(sql, {"instrument_token": instrument_token})
+        result = conn.execute(_SQL_STOCK_FUNDAMENTALS, {"instrument_token": instrument_token})
         row = result.fetchone()
         if not row:
             return None
-        data = dict(row._mapping)
-        for key, value in data.items():
-            if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
-                data[key] = None
-        return data
+        return _sanitize_rows([dict(row._mapping)])[0]
+
+
+_SQL_STOCK_PREDICTION = text("""
+    SELECT
+        symbol,
+        omre_score,
+        signal,
+        score_ai,
+        score_tech,
+        score_sim,
+        score_fund,
+        score_news,
+        sim_match_date,
+        sim_return,
+        created_at
+    FROM predictions
+    WHERE instrument_token = :instrument_token
+    ORDER BY created_at DESC
+    LIMIT 1;
+""")
 
 
 def get_stock_prediction(engine: Engine, instrument_token: int) -> dict | None:
     """Fetch the latest prediction (OMRE Score, Twin Match, etc.) for a stock."""
-    sql = text("""
-        SELECT 
-            symbol,
-            omre_score,
-            signal,
-            score_ai,
-            score_tech,
-            score_sim,
-            score_fund,
-            score_news,
-            sim_match_date,
-            sim_return,
-            created_at
-        FROM predictions
-        WHERE instrument_token = :instrument_token
-        ORDER BY created_at DESC
-        LIMIT 1;
-    """)
     with engine.connect() as conn:
-        result = conn.execute(sql, {"instrument_token": instrument_token})
+        result = conn.execute(_SQL_STOCK_PREDICTION, {"instrument_token": instrument_token})
         row = result.fetchone()
         if not row:
             return None
         return dict(row._mapping)
 
 
-def get_top_scorers(engine: Engine, limit: int = 10) -> list[dict]:
-    """Fetch top stocks by OMRE Score with metadata from stock_master."""
-    sql = text("""
+# Everything the stock-detail page needs in one round-trip: master row,
+# latest indicator candle, latest prediction and fundamentals. Column
+# prefixes (h_/p_/f_) let Python split the row back into sub-dicts.
+_SQL_STOCK_FULL = text("""
+    SELECT
+        m.instrument_token,
+        m.tradingsymbol,
+        m.name,
+        m.exchange,
+        m.last_updated_at,
+        h.ts as h_ts,
+        h.close as h_close,
+        h.rsi_14 as h_rsi_14,
+        h.ema_50_div as h_ema_50_div,
+        h.ema_200_div as h_ema_200_div,
+        h.atr_14_norm as h_atr_14_norm,
+        h.rvol as h_rvol,
+        h.log_return as h_log_return,
+        h.adx_14 as h_adx_14,
+        h.rel_strength as h_rel_strength,
+        h.bb_width as h_bb_width,
+        h.dist_52wh as h_dist_52wh,
+        h.momentum_strength as h_momentum_strength,
+        h.panic_buy_signal as h_panic_buy_signal,
+        h.ema_50_zscore as h_ema_50_zscore,
+        h.trend_regime as h_trend_regime,
+        h.is_breakout as h_is_breakout,
+        p.symbol as p_symbol,
+        p.omre_score as p_omre_score,
+        p.signal as p_signal,
+        p.score_ai as p_score_ai,
+        p.score_tech as p_score_tech,
+        p.score_sim as p_score_sim,
+        p.score_fund as p_score_fund,
+        p.score_news as p_score_news,
+        p.sim_match_date as p_sim_match_date,
+        p.sim_return as p_sim_return,
+        p.created_at as p_created_at,
+        f.debt_to_equity as f_debt_to_equity,
+        f.promoter_holding as f_promoter_holding,
+        f.roe as f_roe,
+        f.pe_ratio as f_pe_ratio,
+        f.market_cap as f_market_cap,
+        f.book_value as f_book_value,
+        f.dividend_yield as f_dividend_yield,
+        f.profit_margin as f_profit_margin,
+        f.current_ratio as f_current_ratio,
+        f.revenue_growth as f_revenue_growth,
+        f.updated_at as f_updated_at
+    FROM stock_master m
+    LEFT JOIN LATERAL (
+        SELECT *
+        FROM stock_history
+        WHERE instrument_token = m.instrument_token
+          AND interval = 'day'
+          AND rsi_14 IS NOT NULL
+        ORDER BY ts DESC
+        LIMIT 1
+    ) h ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT *
+        FROM predictions
+        WHERE instrument_token = m.instrument_token
+        ORDER BY created_at DESC
+        LIMIT 1
+    ) p ON TRUE
+    LEFT JOIN stock_fundamentals f ON m.instrument_token = f.instrument_token
+    WHERE UPPER(m.tradingsymbol) = UPPER(:symbol)
+    LIMIT 1;
+""")
+
+
+def get_stock_full(engine: Engine, symbol: str) -> dict | None:
+    """
+    Fetch the stock-master row plus latest indicators, latest prediction
+    and fundamentals in a single query.
+
+    The detail page previously called get_stock_by_symbol,
+    get_stock_indicators, get_stock_prediction and get_stock_fundamentals
+    back-to-back — four sequential round-trips for one instrument.
+    """
+    with engine.connect() as conn:
+        row = conn.execute(_SQL_STOCK_FULL, {"symbol": symbol}).fetchone()
+    if not row:
+        return None
+
+    data = row._mapping
+
+    def _sub(prefix: str) -> dict | None:
+        sub = {k[len(prefix):]: v for k, v in data.items() if k.startswith(prefix)}
+        # A fully-NULL LATERAL row means the table had no match.
+        return sub if any(v is not None for v in sub.values()) else None
+
+    return {
+        "stock": {
+            k: v for k, v in data.items()
+            if not k.startswith(("h_", "p_", "f_"))
+        },
+        "indicators": _sub("h_"),
+        "prediction": _sub("p_"),
+        "fundamentals": _sub("f_"),
+    }
+
+
+# Indexed ORDER BY .. LIMIT on the latest_predictions materialized view
+# (see init_db) instead of DISTINCT ON over all of predictions.
+_SQL_TOP_SCORERS_MV = text("""
+    SELECT
+        lp.symbol,
+        lp.omre_score,
+        lp.signal,
+        lp.score_ai,
+        lp.score_tech,
+        lp.score_sim,
+        lp.score_fund,
+        lp.score_news,
+        lp.sim_match_date,
+        lp.sim_return,
+        m.name,
+        m.exchange,
+        m.instrument_token
+    FROM latest_predictions lp
+    JOIN stock_master m ON lp.instrument_token = m.instrument_token
+    ORDER BY lp.omre_score DESC
+    LIMIT :limit
+""")
+
+
+def refresh_latest_predictions(engine: Engine) -> None:
+    """Refresh the top-scorers snapshot; run whenever predictions may have changed."""
+    # predictions usually appears after the first migration has already
+    # stamped the schema version, so the view can't rely on init_db having
+    # created it — create it here if it's still missing.
+    ensure_latest_predictions(engine)
+    with engine.begin() as conn:
+        conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY latest_predictions;"))
+
+
+# True when the snapshot is at least as new as the predictions table; a
+# stale view must not be served since nothing in this repo writes
+# predictions and the refresh cadence isn't guaranteed.
+_SQL_TOP_SCORERS_FRESH = text("""
+    SELECT COALESCE((SELECT MAX(created_at) FROM latest_predictions), '-infinity')
+        >= COALESCE((SELECT MAX(created_at) FROM predictions), '-infinity')
+""")
+
+
+# Live fallback while latest_predictions doesn't exist yet: wrap the
+# DISTINCT ON in a subquery so the result can be ordered by omre_score.
+_SQL_TOP_SCORERS = text("""
+    SELECT * FROM (
         SELECT DISTINCT ON (p.symbol)
             p.symbol,
             p.omre_score,
@@ -375,181 +604,184 @@ def get_top_scorers(engine: Engine, limit: int = 10) -> list[dict]:
         FROM predictions p
         JOIN stock_master m ON p.instrument_token = m.instrument_token
         ORDER BY p.symbol, p.created_at DESC
-    """)
-    
-    # Wrap in subquery to order by omre_score
-    full_sql = text("""
-        SELECT * FROM (
-            SELECT DISTINCT ON (p.symbol)
-                p.symbol,
-                p.omre_score,
-                p.signal,
-                p.score_ai,
-                p.score_tech,
-                p.score_sim,
-                p.score_fund,
-                p.score_news,
-                p.sim_match_date,
-                p.sim_return,
-                m.name,
-                m.exchange,
-                m.instrument_token
-            FROM predictions p
-            JOIN stock_master m ON p.instrument_token = m.instrument_token
-            ORDER BY p.symbol, p.created_at DESC
-        ) latest
-        ORDER BY omre_score DESC
-        LIMIT :limit
-    """)
-    
+    ) latest
+    ORDER BY omre_score DESC
+    LIMIT :limit
+""")
+
+
+def get_top_scorers(engine: Engine, limit: int = 10) -> list[dict]:
+    """Fetch top stocks by OMRE Score with metadata from stock_master."""
+    try:
+        with engine.connect() as conn:
+            if conn.execute(_SQL_TOP_SCORERS_FRESH).scalar():
+                result = conn.execute(_SQL_TOP_SCORERS_MV, {"limit": limit})
+                return result.mappings().all()
+    except ProgrammingError:
+        # View not created yet (fresh DB before the first prediction run);
+        # fall back to the live DISTINCT ON query. Anything else —
+        # connection or permission failures — must surface.
+        pass
+
     with engine.connect() as conn:
-        result = conn.execute(full_sql, {"limit": limit})
-        return [dict(row._mapping) for row in result]
+        result = conn.execute(_SQL_TOP_SCORERS, {"limit": limit})
+        return result.mappings().all()
+
+
+# change/pct computed in SQL; log_return is stored as a percentage.
+_SQL_MOST_VOLATILE = text("""
+    SELECT
+        m.tradingsymbol as symbol,
+        m.name,
+        m.exchange,
+        m.instrument_token,
+        h.log_return,
+        h.close as price,
+        h.ts,
+        ROUND((COALESCE(h.close, 0) * h.log_return / 100.0)::numeric, 2) AS change,
+        ROUND(h.log_return::numeric, 2) AS change_percent,
+        h.log_return >= 0 AS is_up
+    FROM stock_master m
+    JOIN LATERAL (
+        SELECT log_return, close, ts
+        FROM stock_history
+        WHERE instrument_token = m.instrument_token
+          AND interval = 'day'
+          AND log_return IS NOT NULL
+        ORDER BY ts DESC
+        LIMIT 1
+    ) h ON TRUE
+    ORDER BY ABS(h.log_return) DESC
+    LIMIT :limit
+""")
 
 
 def get_most_volatile(engine: Engine, limit: int = 25) -> list[dict]:
     """Fetch stocks with highest fluctuation (absolute log_return) with latest price data."""
-    full_sql = text("""
-        SELECT 
-            m.tradingsymbol as symbol,
-            m.name,
-            m.exchange,
-            m.instrument_token,
-            h.log_return,
-            h.close as price,
-            h.ts
-        FROM stock_master m
-        JOIN LATERAL (
-            SELECT log_return, close, ts
-            FROM stock_history 
-            WHERE instrument_token = m.instrument_token 
-              AND interval = 'day' 
-              AND log_return IS NOT NULL
-            ORDER BY ts DESC 
-            LIMIT 1
-        ) h ON TRUE
-        ORDER BY ABS(h.log_return) DESC
-        LIMIT :limit
-    """)
-    
     with engine.connect() as conn:
-        result = conn.execute(full_sql, {"limit": limit})
-        rows = [dict(row._mapping) for row in result]
-    
-    # Calculate price change from log_return
+        result = conn.execute(_SQL_MOST_VOLATILE, {"limit": limit})
+        rows = [dict(m) for m in result.mappings()]
+
+    # NUMERIC comes back as Decimal; coerce to the JSON-friendly types the
+    # frontend expects.
     for row in rows:
-        log_ret = row.get('log_return') or 0
-        price = row.get('price') or 0
-        # log_return is stored as percentage, convert to price change
-        row['change'] = round(price * (log_ret / 100), 2)
-        row['changePercent'] = round(log_ret, 2)
-        row['isUp'] = log_ret >= 0
-    
+        row['change'] = float(row['change'] or 0)
+        row['changePercent'] = float(row.pop('change_percent') or 0)
+        row['isUp'] = bool(row.pop('is_up'))
+
     return rows
 
 
+# Major indices shown on the dashboard - stored in stock_master.
+# (symbol, display_name), in display order.
+_MAJOR_INDICES = (
+    ("NIFTY 50", "NIFTY 50"),
+    ("NIFTY BANK", "BANK NIFTY"),
+    ("SENSEX", "SENSEX"),
+    ("NIFTY MID SELECT", "MIDCAP NIFTY"),
+    ("NIFTY IT", "NIFTY IT"),
+    ("NIFTY HEALTHCARE", "NIFTY HEALTHCARE"),
+    ("NIFTY AUTO", "NIFTY AUTO"),
+    ("NIFTY FMCG", "NIFTY FMCG"),
+    ("NIFTY METAL", "NIFTY METAL"),
+    ("NIFTY ENERGY", "NIFTY ENERGY"),
+    ("NIFTY FIN SERVICE", "NIFTY FIN SERVICE"),
+)
+_INDEX_SYMBOLS = [symbol for symbol, _ in _MAJOR_INDICES]
+_INDEX_DISPLAY = dict(_MAJOR_INDICES)
+_INDEX_ORDER = {symbol: i for i, symbol in enumerate(_INDEX_SYMBOLS)}
+
+# One row per index with price/change/pct computed in SQL (see
+# _SQL_TICKER_HISTORY for the LAG/DISTINCT ON shape); index symbols
+# are matched exact-case.
+_SQL_INDICES_HISTORY = text("""
+    WITH resolved AS (
+        SELECT instrument_token, tradingsymbol
+        FROM stock_master
+        WHERE tradingsymbol = ANY(:syms)
+    ),
+    recent AS (
+        SELECT h.instrument_token, h.ts, h.close,
+               LAG(h.close) OVER (PARTITION BY h.instrument_token ORDER BY h.ts) AS prev_close
+        FROM stock_history h
+        WHERE h.instrument_token IN (SELECT instrument_token FROM resolved)
+          AND h.interval = 'day'
+          AND h.ts >= NOW() - INTERVAL '30 days'
+    )
+    SELECT DISTINCT ON (rec.instrument_token)
+           rec.instrument_token,
+           res.tradingsymbol,
+           COALESCE(rec.close, 0) AS price,
+           ROUND((rec.close - COALESCE(rec.prev_close, rec.close))::numeric, 2) AS change,
+           ROUND(CASE WHEN COALESCE(rec.prev_close, rec.close) <> 0
+                      THEN ((rec.close - COALESCE(rec.prev_close, rec.close))
+                            / COALESCE(rec.prev_close, rec.close) * 100)::numeric
+                      ELSE 0 END, 2) AS change_percent,
+           (rec.close - COALESCE(rec.prev_close, rec.close)) >= 0 AS is_up
+    FROM recent rec
+    JOIN resolved res USING (instrument_token)
+    ORDER BY rec.instrument_token, rec.ts DESC;
+""").bindparams(bindparam("syms", type_=ARRAY(Text)))
+
+
 def get_major_indices(engine: Engine) -> list[dict]:
     """Fetch major market indices (NIFTY 50, BANKNIFTY, SENSEX, MIDCPNIFTY) with latest prices."""
-    # Major indices to fetch - stored in stock_master
-    indices = [
-        {"symbol": "NIFTY 50", "display_name": "NIFTY 50"},
-        {"symbol": "NIFTY BANK", "display_name": "BANK NIFTY"},
-        {"symbol": "SENSEX", "display_name": "SENSEX"},
-        {"symbol": "NIFTY MID SELECT", "display_name": "MIDCAP NIFTY"},
-        {"symbol": "NIFTY IT", "display_name": "NIFTY IT"},
-        {"symbol": "NIFTY HEALTHCARE", "display_name": "NIFTY HEALTHCARE"},
-        {"symbol": "NIFTY AUTO", "display_name": "NIFTY AUTO"},
-        {"symbol": "NIFTY FMCG", "display_name": "NIFTY FMCG"},
-        {"symbol": "NIFTY METAL", "display_name": "NIFTY METAL"},
-        {"symbol": "NIFTY ENERGY", "display_name": "NIFTY ENERGY"},
-        {"symbol": "NIFTY FIN SERVICE", "display_name": "NIFTY FIN SERVICE"},
-    ]
-    
-    index_symbols = [idx["symbol"] for idx in indices]
-    symbol_to_display = {idx["symbol"]: idx["display_name"] for idx in indices}
-    
-    # Get tokens for these indices
-    bind_params = {f"s{i}": s for i, s in enumerate(index_symbols)}
-    bind_clause = ", ".join([f":s{i}" for i in range(len(index_symbols))])
-    
-    sql_tokens = text(f"""
-        SELECT instrument_token, tradingsymbol 
-        FROM stock_master 
-        WHERE tradingsymbol IN ({bind_clause})
-    """)
-    
-    sym_map = {}
-    tokens = []
-    
-    with engine.connect() as conn:
-        res_tokens = conn.execute(sql_tokens, bind_params).fetchall()
-        for r in res_tokens:
-            sym_map[r.instrument_token] = r.tradingsymbol
-            tokens.append(r.instrument_token)
-    
-    if not tokens:
-        return []
-    
-    token_str = ",".join(map(str, tokens))
-    
-    # Fetch latest 2 candles for price change calculation
-    sql_history = text(f"""
-        SELECT t.instrument_token, h.ts, h.close
-        FROM (SELECT unnest(ARRAY[{token_str}]::bigint[]) as instrument_token) t
-        CROSS JOIN LATERAL (
-            SELECT ts, close
-            FROM stock_history
-            WHERE instrument_token = t.instrument_token
-              AND interval = 'day'
-            ORDER BY ts DESC
-            LIMIT 2
-        ) h;
-    """)
-    
+    # Dashboard renders hit this on every request but daily candles change
+    # rarely; a short TTL absorbs nearly all of the DB traffic.
+    cached = indices_cache.get("major_indices")
+    if cached is not None:
+        return cached
+
     with engine.connect() as conn:
-        rows = conn.execute(sql_history).fetchall()
-    
-    grouped_data = {}
-    for r in rows:
-        tok = r.instrument_token
-        if tok not in grouped_data:
-            grouped_data[tok] = []
-        grouped_data[tok].append(r)
-    
+        rows = conn.execute(_SQL_INDICES_HISTORY, {"syms": _INDEX_SYMBOLS}).fetchall()
+
     results = []
-    for tok, candles in grouped_data.items():
-        symbol = sym_map.get(tok)
-        if not symbol:
-            continue
-            
-        candles.sort(key=lambda x: x.ts, reverse=True)
-        
-        latest = candles[0] if candles else None
-        prev = candles[1] if len(candles) > 1 else None
-        
-        price = latest.close if latest else 0.0
-        prev_close = prev.close if prev else price
-        
-        change = price - prev_close
-        pct = (change / prev_close * 100) if prev_close else 0.0
-        
+    for r in rows:
+        symbol = r.tradingsymbol
         results.append({
             "symbol": symbol,
-            "display_name": symbol_to_display.get(symbol, symbol),
-            "instrument_token": tok,
-            "price": price,
-            "change": round(change, 2),
-            "changePercent": round(pct, 2),
-            "isUp": change >= 0
+            "display_name": _INDEX_DISPLAY.get(symbol, symbol),
+            "instrument_token": r.instrument_token,
+            "price": r.price,
+            "change": float(r.change or 0),
+            "changePercent": float(r.change_percent or 0),
+            "isUp": bool(r.is_up)
         })
-    
+
     # Sort results by the original indices order
-    order_map = {s: i for i, s in enumerate(index_symbols)}
-    results.sort(key=lambda x: order_map.get(x["symbol"], 99))
-    
+    results.sort(key=lambda x: _INDEX_ORDER.get(x["symbol"], 99))
+
+    indices_cache.set("major_indices", results)
     return results
 
 
+_SQL_TOKEN_FOR_SYMBOL = text(
+    "SELECT instrument_token FROM stock_master WHERE tradingsymbol = :symbol"
+)
+
+# Five LIMIT 1 OFFSET k scalar subqueries — each a short index descent
+# on (instrument_token, interval, ts DESC) — instead of materializing
+# 30 rows through a ROW_NUMBER window.
+_SQL_STOCK_RETURNS = text("""
+    SELECT
+        (SELECT close FROM stock_history
+         WHERE instrument_token = :token AND interval = 'day'
+         ORDER BY ts DESC LIMIT 1 OFFSET 0) as close_today,
+        (SELECT close FROM stock_history
+         WHERE instrument_token = :token AND interval = 'day'
+         ORDER BY ts DESC LIMIT 1 OFFSET 5) as close_5d,
+        (SELECT close FROM stock_history
+         WHERE instrument_token = :token AND interval = 'day'
+         ORDER BY ts DESC LIMIT 1 OFFSET 10) as close_10d,
+        (SELECT close FROM stock_history
+         WHERE instrument_token = :token AND interval = 'day'
+         ORDER BY ts DESC LIMIT 1 OFFSET 15) as close_15d,
+        (SELECT close FROM stock_history
+         WHERE instrument_token = :token AND interval = 'day'
+         ORDER BY ts DESC LIMIT 1 OFFSET 25) as close_25d
+""")
+
+
 def get_stock_returns(engine: Engine, symbol: str) -> dict:
     """
     Calculate 5, 10, 15, 25 day returns for a stock.
@@ -557,7 +789,7 @@ def get_stock_returns(engine: Engine, symbol: str) -> dict:
     """
     with engine.connect() as conn:
         token_res = conn.execute(
-            text("SELECT instrument_token FROM stock_master WHERE tradingsymbol = :symbol"),
+            _SQL_TOKEN_FOR_SYMBOL,
             {"symbol": symbol}
         ).fetchone()
 
@@ -570,26 +802,8 @@ def get_stock_returns(engine: Engine, symbol: str) -> dict:
             }
             
         token = token_res[0]
-        
-        result = conn.execute(text("""
-            WITH daily_closes AS (
-                SELECT 
-                    close,
-                    ts::date as date,
-                    ROW_NUMBER() OVER (ORDER BY ts DESC) as row_num
-                FROM stock_history h
-                WHERE h.instrument_token = :token 
-                  AND h.interval = 'day'
-                ORDER BY ts DESC
-                LIMIT 30
-            )
-            SELECT 
-                (SELECT close FROM daily_closes WHERE row_num = 1) as close_today,
-                (SELECT close FROM daily_closes WHERE row_num = 6) as close_5d,
-                (SELECT close FROM daily_closes WHERE row_num = 11) as close_10d,
-                (SELECT close FROM daily_closes WHERE row_num = 16) as close_15d,
-                (SELECT close FROM daily_closes WHERE row_num = 26) as close_25d
-        """), {"token": token})
+
+        result = conn.execute(_SQL_STOCK_RETURNS, {"token": token})
         
         row = result.fetchone()
         
@@ -645,115 +859,140 @@ def filter_stocks(
     - Specific Symbols (for Watchlist)
     """
     
-    # Base query joining mostly used tables
-    # using DISTINCT ON (p.symbol) to get latest prediction
-    
-    query = """
-        SELECT * FROM (
-            SELECT DISTINCT ON (m.tradingsymbol)
+    # Filter base-table columns (symbols, exchange, fundamentals) in a
+    # candidates CTE first, then LATERAL-join the latest prediction and
+    # candle only for surviving rows. The old DISTINCT ON subquery ran
+    # the join for every stock and filtered afterwards; the planner can't
+    # always push predicates through DISTINCT ON, so most of that work
+    # was discarded.
+
+    params = {"limit": limit, "offset": offset}
+
+    candidate_where = ""
+    if symbols:
+        candidate_where += " AND m.tradingsymbol = ANY(:symbols)"
+        params["symbols"] = symbols
+
+    if exchange:
+        candidate_where += " AND UPPER(m.exchange) = UPPER(:exchange)"
+        params["exchange"] = exchange
+
+    if min_market_cap is not None:
+        candidate_where += " AND f.market_cap >= :min_market_cap"
+        params["min_market_cap"] = min_market_cap
+
+    if max_market_cap is not None:
+        candidate_where += " AND f.market_cap <= :max_market_cap"
+        params["max_market_cap"] = max_market_cap
+
+    if min_pe is not None:
+        candidate_where += " AND f.pe_ratio >= :min_pe"
+        params["min_pe"] = min_pe
+
+    if max_pe is not None:
+        candidate_where += " AND f.pe_ratio <= :max_pe"
+        params["max_pe"] = max_pe
+
+    query = f"""
+        WITH candidates AS (
+            SELECT
                 m.instrument_token,
-                m.tradingsymbol as symbol,
+                m.tradingsymbol,
                 m.name,
-                m.name as company_name,
                 m.exchange,
-                p.omre_score,
-                p.signal,
-                p.score_ai,
-                p.score_tech,
-                p.score_fund,
-                p.score_news,
                 f.market_cap,
                 f.pe_ratio,
                 f.roe,
-                f.debt_to_equity,
-                p.created_at,
-                h.close as current_price,
-                h.log_return as change_percent
+                f.debt_to_equity
             FROM stock_master m
-            LEFT JOIN predictions p ON m.instrument_token = p.instrument_token
             LEFT JOIN stock_fundamentals f ON m.instrument_token = f.instrument_token
-            LEFT JOIN LATERAL (
-                SELECT close, log_return
-                FROM stock_history
-                WHERE instrument_token = m.instrument_token
-                  AND interval = 'day'
-                ORDER BY ts DESC
-                LIMIT 1
-            ) h ON TRUE
-            ORDER BY m.tradingsymbol, p.created_at DESC
-        ) latest
+            WHERE 1=1{candidate_where}
+        )
+        SELECT
+            c.instrument_token,
+            c.tradingsymbol as symbol,
+            c.name,
+            c.name as company_name,
+            c.exchange,
+            p.omre_score,
+            p.signal,
+            p.score_ai,
+            p.score_tech,
+            p.score_fund,
+            p.score_news,
+            c.market_cap,
+            c.pe_ratio,
+            c.roe,
+            c.debt_to_equity,
+            p.created_at,
+            h.close as current_price,
+            h.log_return as change_percent
+        FROM candidates c
+        LEFT JOIN LATERAL (
+            SELECT omre_score, signal, score_ai, score_tech, score_fund,
+                   score_news, created_at
+            FROM predictions
+            WHERE instrument_token = c.instrument_token
+            ORDER BY created_at DESC
+            LIMIT 1
+        ) p ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT close, log_return
+            FROM stock_history
+            WHERE instrument_token = c.instrument_token
+              AND interval = 'day'
+            ORDER BY ts DESC
+            LIMIT 1
+        ) h ON TRUE
         WHERE 1=1
     """
-    
-    params = {"limit": limit, "offset": offset}
-    
-    if symbols:
-        query += " AND symbol = ANY(:symbols)"
-        params["symbols"] = symbols
 
+    # Predicates on LATERAL output stay in the outer WHERE.
     if min_score is not None:
-        query += " AND omre_score >= :min_score"
+        query += " AND p.omre_score >= :min_score"
         params["min_score"] = min_score
-        
+
     if max_score is not None:
-        query += " AND omre_score <= :max_score"
+        query += " AND p.omre_score <= :max_score"
         params["max_score"] = max_score
-        
+
     if signal:
-        query += " AND UPPER(signal) = UPPER(:signal)"
+        query += " AND UPPER(p.signal) = UPPER(:signal)"
         params["signal"] = signal
-        
-    if min_market_cap is not None:
-        query += " AND market_cap >= :min_market_cap"
-        params["min_market_cap"] = min_market_cap
-        
-    if max_market_cap is not None:
-        query += " AND market_cap <= :max_market_cap"
-        params["max_market_cap"] = max_market_cap
 
-    if min_pe is not None:
-        query += " AND pe_ratio >= :min_pe"
-        params["min_pe"] = min_pe
-        
-    if max_pe is not None:
-        query += " AND pe_ratio <= :max_pe"
-        params["max_pe"] = max_pe
-        
-    if exchange:
-        query += " AND UPPER(exchange) = UPPER(:exchange)"
-        params["exchange"] = exchange
-        
     if max_price is not None:
-        query += " AND current_price <= :max_price"
+        query += " AND h.close <= :max_price"
         params["max_price"] = max_price
-        
+
     # Default sort by score desc if filtering by score, otherwise symbol
     if min_score is not None or max_score is not None:
-        query += " ORDER BY omre_score DESC"
+        query += " ORDER BY p.omre_score DESC"
     else:
-        # Fixed: must use 'symbol' because outer query has renamed 'tradingsymbol' to 'symbol'
-        query += " ORDER BY symbol"
-        
+        query += " ORDER BY c.tradingsymbol"
+
     query += " LIMIT :limit OFFSET :offset"
-    
-    import math
 
     with engine.connect() as conn:
         result = conn.execute(text(query), params)
-        rows = [dict(row._mapping) for row in result]
-        
-        # Sanitize data to remove NaN/Infinity which cause JSON serialization errors
-        for row in rows:
-            for key, value in row.items():
-                if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
-                    row[key] = None
-                    
-        return rows
+        rows = [dict(m) for m in result.mappings()]
+        # Remove NaN/Infinity which cause JSON serialization errors
+        return _sanitize_rows(rows)
+
+
+_SQL_GHOST_DATA = text("""
+    SELECT ts, close
+    FROM stock_history
+    WHERE instrument_token = :instrument_token
+      AND interval = 'day'
+      AND ts >= :start_date
+      AND ts <= :end_date
+    ORDER BY ts ASC;
+""")
 
 
 def get_ghost_data(
-    engine: Engine, 
-    instrument_token: int, 
+    engine: Engine,
+    instrument_token: int,
     match_date: dt.date
 ) -> list[dict]:
     """
@@ -764,21 +1003,11 @@ def get_ghost_data(
     start_date = match_date - dt.timedelta(days=180)
     end_date = match_date + dt.timedelta(days=60)
     
-    sql = text("""
-        SELECT ts, close
-        FROM stock_history
-        WHERE instrument_token = :instrument_token 
-          AND interval = 'day'
-          AND ts >= :start_date 
-          AND ts <= :end_date
-        ORDER BY ts ASC;
-    """)
-    
     with engine.connect() as conn:
-        result = conn.execute(sql, {
+        result = conn.execute(_SQL_GHOST_DATA, {
             "instrument_token": instrument_token,
             "start_date": start_date,
             "end_date": end_date
         })
-        return [dict(row._mapping) for row in result]
+        return result.mappings().all()
 
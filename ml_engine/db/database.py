@@ -1,14 +1,59 @@
 from __future__ import annotations
+import functools
 from dataclasses import dataclass
 from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine
-from ml_engine.core.config import DATABASE_URL
+from ml_engine.core.config import DATABASE_URL, DATABASE_URL_REPLICA, env
+
+# Pool sizing is env-tunable so deployments can match it to their worker
+# count (e.g. the daily_update thread pool) without code changes.
+_POOL_SIZE = int(env("DB_POOL_SIZE", "20"))
+_MAX_OVERFLOW = int(env("DB_MAX_OVERFLOW", "30"))
 
 @dataclass(frozen=True)
 class Db:
     engine: Engine
 
+@functools.lru_cache(maxsize=1)
 def get_engine() -> Engine:
     if not DATABASE_URL:
         raise RuntimeError("DATABASE_URL is not set")
-    return create_engine(DATABASE_URL, pool_pre_ping=True)
+    return create_engine(
+        DATABASE_URL,
+        pool_pre_ping=True,
+        # LIFO checkout keeps reusing the hottest backends, so their PG
+        # plan/relation caches stay warm; recycle guards against the cloud
+        # provider silently dropping idle connections.
+        pool_use_lifo=True,
+        pool_size=_POOL_SIZE,
+        max_overflow=_MAX_OVERFLOW,
+        pool_recycle=1800,
+        # Large enough that the module-level text() statements across the
+        # CRUD layer never evict each other.
+        query_cache_size=1200,
+        # Deliberately on the default executemany mode: execute_batch
+        # reports only the last statement's rowcount, which breaks the
+        # row-written counts the upsert helpers return. Bulk ingestion
+        # avoids per-row round trips via the COPY path in crud_stock
+        # instead; insertmanyvalues covers compiled insert() constructs.
+        insertmanyvalues_page_size=1000,
+    )
+
+@functools.lru_cache(maxsize=1)
+def get_read_engine() -> Engine:
+    """Engine for read-only queries.
+
+    Bound to DATABASE_URL_REPLICA when configured; otherwise this is the
+    primary engine, so callers can route reads through it unconditionally.
+    """
+    if not DATABASE_URL_REPLICA:
+        return get_engine()
+    return create_engine(
+        DATABASE_URL_REPLICA,
+        pool_pre_ping=True,
+        pool_use_lifo=True,
+        pool_size=_POOL_SIZE,
+        max_overflow=_MAX_OVERFLOW,
+        pool_recycle=1800,
+        query_cache_size=1200,
+    )
@@ -1,7 +1,283 @@
 from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
+# All unconditional CREATE TABLE DDL, sent to Postgres as one script in a
+# single round-trip instead of ~15 sequential execute calls; IF NOT EXISTS
+# keeps re-runs cheap. Tables appear in foreign-key dependency order.
+_CREATE_TABLES_SQL = """
+CREATE TABLE IF NOT EXISTS users (
+  id SERIAL PRIMARY KEY,
+  email TEXT UNIQUE NOT NULL,
+  hashed_password TEXT NOT NULL,
+  full_name TEXT,
+  is_active BOOLEAN DEFAULT TRUE,
+  approval_status TEXT DEFAULT 'pending' CHECK (approval_status IN ('pending', 'approved', 'rejected')),
+  queue_position INTEGER,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS stock_master (
+  instrument_token BIGINT PRIMARY KEY,
+  tradingsymbol TEXT,
+  name TEXT,
+  exchange TEXT,
+  last_updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  is_stable BOOLEAN DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS waitlist (
+    id SERIAL PRIMARY KEY,
+    email TEXT UNIQUE NOT NULL,
+    full_name TEXT,
+    source TEXT DEFAULT 'early_access_modal',
+    queue_position INTEGER,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    converted_to_user BOOLEAN DEFAULT FALSE,
+    converted_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS subscription_plans (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    duration_months INTEGER NOT NULL,
+    original_price INTEGER NOT NULL,
+    founding_price INTEGER NOT NULL,
+    per_month_label TEXT,
+    savings_percent INTEGER DEFAULT 0,
+    features JSONB DEFAULT '[]',
+    badge TEXT,
+    badge_icon TEXT,
+    is_highlighted BOOLEAN DEFAULT FALSE,
+    display_order INTEGER DEFAULT 0,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS user_subscriptions (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    plan_id INTEGER NOT NULL REFERENCES subscription_plans(id),
+    status TEXT DEFAULT 'active' CHECK (status IN ('active', 'expired', 'cancelled')),
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ,
+    payment_id TEXT,
+    payment_amount INTEGER,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS portfolios (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    balance DOUBLE PRECISION DEFAULT 1000000.0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT unique_user_portfolio UNIQUE (user_id)
+);
+
+CREATE TABLE IF NOT EXISTS positions (
+    id SERIAL PRIMARY KEY,
+    portfolio_id INTEGER NOT NULL REFERENCES portfolios(id),
+    instrument_token BIGINT NOT NULL REFERENCES stock_master(instrument_token),
+    symbol TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    avg_price DOUBLE PRECISION NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT unique_portfolio_token UNIQUE (portfolio_id, instrument_token)
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id SERIAL PRIMARY KEY,
+    portfolio_id INTEGER NOT NULL REFERENCES portfolios(id),
+    instrument_token BIGINT NOT NULL REFERENCES stock_master(instrument_token),
+    symbol TEXT NOT NULL,
+    type TEXT NOT NULL CHECK (type IN ('BUY', 'SELL')),
+    quantity INTEGER NOT NULL,
+    price DOUBLE PRECISION NOT NULL,
+    amount DOUBLE PRECISION NOT NULL,
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS watchlists (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    instrument_token BIGINT NOT NULL,
+    symbol TEXT NOT NULL,
+    added_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT unique_user_watchlist UNIQUE (user_id, instrument_token)
+);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    type TEXT NOT NULL CHECK (type IN ('alert', 'system', 'score_change')),
+    title TEXT NOT NULL,
+    message TEXT,
+    is_read BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS user_alert_preferences (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) UNIQUE,
+    email_alerts BOOLEAN DEFAULT TRUE,
+    push_alerts BOOLEAN DEFAULT TRUE,
+    score_threshold INTEGER DEFAULT 70,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS stock_orders (
+    id SERIAL PRIMARY KEY,
+    portfolio_id INTEGER NOT NULL REFERENCES portfolios(id),
+    instrument_token BIGINT NOT NULL,
+    symbol TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    action TEXT NOT NULL CHECK (action IN ('BUY', 'SELL')),
+    order_type TEXT NOT NULL CHECK (order_type IN ('MARKET', 'LIMIT', 'STOP')),
+    limit_price DOUBLE PRECISION,
+    status TEXT DEFAULT 'PENDING' CHECK (status IN ('PENDING', 'EXECUTED', 'CANCELLED', 'REJECTED')),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    executed_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS price_alerts (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    instrument_token BIGINT,
+    symbol TEXT NOT NULL,
+    target_price DOUBLE PRECISION NOT NULL,
+    condition TEXT NOT NULL CHECK (condition IN ('ABOVE', 'BELOW')),
+    is_active BOOLEAN DEFAULT TRUE,
+    triggered_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS learning_modules (
+    id SERIAL PRIMARY KEY,
+    title TEXT NOT NULL,
+    category TEXT NOT NULL,
+    read_time TEXT,
+    description TEXT,
+    level TEXT CHECK (level IN ('Beginner', 'Intermediate', 'Advanced')),
+    content TEXT,
+    display_order INTEGER DEFAULT 0,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS stock_history (
+  instrument_token BIGINT NOT NULL,
+  ts TIMESTAMPTZ NOT NULL,
+  interval TEXT NOT NULL,
+  open DOUBLE PRECISION,
+  high DOUBLE PRECISION,
+  low DOUBLE PRECISION,
+  close DOUBLE PRECISION,
+  volume DOUBLE PRECISION,
+  oi DOUBLE PRECISION,
+  log_return DOUBLE PRECISION,
+  rsi_14 DOUBLE PRECISION,
+  ema_50_div DOUBLE PRECISION,
+  atr_14_norm DOUBLE PRECISION,
+  rvol DOUBLE PRECISION,
+  pattern_doji SMALLINT,
+  pattern_hammer SMALLINT,
+  pattern_engulfing SMALLINT,
+  pattern_morning_star SMALLINT,
+  pattern_shooting_star SMALLINT,
+  ema_200_div DOUBLE PRECISION,
+  target_3d SMALLINT,
+  news_sentiment DOUBLE PRECISION,
+  CONSTRAINT stock_history_pk PRIMARY KEY (instrument_token, ts, interval)
+);
+"""
+
+# Bump whenever the DDL below changes; warm restarts whose sentinel
+# already matches skip the whole sweep after one SELECT.
+_SCHEMA_VERSION = 1
+
+# Arbitrary app-wide advisory-lock key for schema migration.
+_INIT_LOCK_KEY = 4242
+
+
+def _current_schema_version(engine: Engine) -> int:
+    try:
+        with engine.connect() as conn:
+            version = conn.execute(
+                text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+            ).scalar()
+            return int(version or 0)
+    except Exception:
+        return 0  # schema_migrations itself is missing on first run
+
+
 def init_db(engine: Engine) -> None:
+    if _current_schema_version(engine) >= _SCHEMA_VERSION:
+        return
+
+    # Hold an advisory lock while migrating so concurrent workers don't
+    # race through the same DDL; whoever arrives second re-checks the
+    # sentinel once the lock is free and skips.
+    with engine.connect() as lock_conn:
+        lock_conn.execute(text(f"SELECT pg_advisory_lock({_INIT_LOCK_KEY});"))
+        try:
+            from_version = _current_schema_version(engine)
+            if from_version >= _SCHEMA_VERSION:
+                return
+            _apply_schema(engine, from_version)
+            with engine.begin() as conn:
+                conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                      version INTEGER PRIMARY KEY,
+                      applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                    );
+                """))
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version) VALUES (:v) ON CONFLICT DO NOTHING;"),
+                    {"v": _SCHEMA_VERSION},
+                )
+        finally:
+            lock_conn.execute(text(f"SELECT pg_advisory_unlock({_INIT_LOCK_KEY});"))
+
+
+def ensure_latest_predictions(engine: Engine) -> None:
+    """Create the top-scorers snapshot if it doesn't exist yet.
+
+    Small materialized view of the newest prediction per symbol so
+    get_top_scorers is an indexed ORDER BY .. LIMIT instead of DISTINCT ON
+    over the whole predictions table. Raises if predictions itself is
+    still missing. The unique index is what allows REFRESH CONCURRENTLY.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE MATERIALIZED VIEW IF NOT EXISTS latest_predictions AS
+            SELECT DISTINCT ON (symbol)
+                symbol,
+                instrument_token,
+                omre_score,
+                signal,
+                score_ai,
+                score_tech,
+                score_sim,
+                score_fund,
+                score_news,
+                sim_match_date,
+                sim_return,
+                created_at
+            FROM predictions
+            ORDER BY symbol, created_at DESC;
+        """))
+        conn.execute(text("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_latest_predictions_symbol
+            ON latest_predictions (symbol);
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_latest_predictions_score
+            ON latest_predictions (omre_score DESC);
+        """))
+
+
+def _apply_schema(engine: Engine, from_version: int = 0) -> None:
     try:
         with engine.begin() as conn:
             conn.execute(text("CREATE EXTENSION IF NOT EXISTS timescaledb;"))
@@ -9,315 +285,80 @@ def init_db(engine: Engine) -> None:
         pass
 
     with engine.begin() as conn:
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS users (
-                  id SERIAL PRIMARY KEY,
-                  email TEXT UNIQUE NOT NULL,
-                  hashed_password TEXT NOT NULL,
-                  full_name TEXT,
-                  is_active BOOLEAN DEFAULT TRUE,
-                  approval_status TEXT DEFAULT 'pending' CHECK (approval_status IN ('pending', 'approved', 'rejected')),
-                  queue_position INTEGER,
-                  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                );
-                """
-            )
-        )
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS stock_master (
-                  instrument_token BIGINT PRIMARY KEY,
-                  tradingsymbol TEXT,
-                  name TEXT,
-                  exchange TEXT,
-                  last_updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                  is_stable BOOLEAN DEFAULT FALSE
-                );
-                """
-            )
-        )
+        conn.exec_driver_sql(_CREATE_TABLES_SQL)
+
+        # One-time column migrations from the pre-versioned schema. Gated
+        # on the version we're migrating from so future _SCHEMA_VERSION
+        # bumps never re-run them — the users backfill in particular is an
+        # O(N) UPDATE that holds row locks across the whole table.
+        if from_version < 1:
+            try:
+                conn.execute(text("ALTER TABLE stock_master DROP COLUMN IF EXISTS segment;"))
+                conn.execute(text("ALTER TABLE stock_master DROP COLUMN IF EXISTS instrument_type;"))
+                conn.execute(text("ALTER TABLE stock_master ADD COLUMN IF NOT EXISTS is_stable BOOLEAN DEFAULT FALSE;"))
+            except Exception:
+                pass
+
+            try:
+                conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS approval_status TEXT DEFAULT 'pending';"))
+                conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS queue_position INTEGER;"))
+                conn.execute(text("""
+                    UPDATE users
+                    SET queue_position = subq.rn
+                    FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY id) as rn FROM users WHERE queue_position IS NULL) subq
+                    WHERE users.id = subq.id AND users.queue_position IS NULL;
+                """))
+            except Exception:
+                pass
+
+        # Shared queue_position generator for users/waitlist signups:
+        # nextval() is an O(1) atomic increment, replacing the racy
+        # SELECT MAX() scans over both tables. setval keeps the sequence
+        # ahead of any positions assigned before it existed.
         try:
-            conn.execute(text("ALTER TABLE stock_master DROP COLUMN IF EXISTS segment;"))
-            conn.execute(text("ALTER TABLE stock_master DROP COLUMN IF EXISTS instrument_type;"))
-            conn.execute(text("ALTER TABLE stock_master ADD COLUMN IF NOT EXISTS is_stable BOOLEAN DEFAULT FALSE;"))
+            conn.execute(text("CREATE SEQUENCE IF NOT EXISTS queue_position_seq;"))
+            conn.execute(text("""
+                SELECT setval('queue_position_seq', GREATEST(
+                    COALESCE((SELECT MAX(queue_position) FROM users), 0),
+                    COALESCE((SELECT MAX(queue_position) FROM waitlist), 0),
+                    (SELECT last_value FROM queue_position_seq)
+                ));
+            """))
         except Exception:
             pass
-        
+
+        # Add index for user subscriptions lookup
         try:
-            conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS approval_status TEXT DEFAULT 'pending';"))
-            conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS queue_position INTEGER;"))
             conn.execute(text("""
-                UPDATE users 
-                SET queue_position = subq.rn 
-                FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY id) as rn FROM users WHERE queue_position IS NULL) subq 
-                WHERE users.id = subq.id AND users.queue_position IS NULL;
+                CREATE INDEX IF NOT EXISTS idx_user_subscriptions_user_id
+                ON user_subscriptions(user_id);
             """))
         except Exception:
             pass
-        
-        # Create waitlist table for email-only signups
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS waitlist (
-                    id SERIAL PRIMARY KEY,
-                    email TEXT UNIQUE NOT NULL,
-                    full_name TEXT,
-                    source TEXT DEFAULT 'early_access_modal',
-                    queue_position INTEGER,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    converted_to_user BOOLEAN DEFAULT FALSE,
-                    converted_at TIMESTAMPTZ
-                );
-                """
-            )
-        )
-        
-        # Create subscription_plans table for pricing
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS subscription_plans (
-                    id SERIAL PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    duration_months INTEGER NOT NULL,
-                    original_price INTEGER NOT NULL,
-                    founding_price INTEGER NOT NULL,
-                    per_month_label TEXT,
-                    savings_percent INTEGER DEFAULT 0,
-                    features JSONB DEFAULT '[]',
-                    badge TEXT,
-                    badge_icon TEXT,
-                    is_highlighted BOOLEAN DEFAULT FALSE,
-                    display_order INTEGER DEFAULT 0,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                );
-                """
-            )
-        )
-        
-        # Create user_subscriptions table to track user plans
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS user_subscriptions (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER NOT NULL REFERENCES users(id),
-                    plan_id INTEGER NOT NULL REFERENCES subscription_plans(id),
-                    status TEXT DEFAULT 'active' CHECK (status IN ('active', 'expired', 'cancelled')),
-                    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    expires_at TIMESTAMPTZ,
-                    payment_id TEXT,
-                    payment_amount INTEGER,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                );
-                """
-            )
-        )
-
-        # Create paper trading tables
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS portfolios (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER NOT NULL REFERENCES users(id),
-                    balance DOUBLE PRECISION DEFAULT 1000000.0,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    CONSTRAINT unique_user_portfolio UNIQUE (user_id)
-                );
-                """
-            )
-        )
-
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS positions (
-                    id SERIAL PRIMARY KEY,
-                    portfolio_id INTEGER NOT NULL REFERENCES portfolios(id),
-                    instrument_token BIGINT NOT NULL REFERENCES stock_master(instrument_token),
-                    symbol TEXT NOT NULL,
-                    quantity INTEGER NOT NULL,
-                    avg_price DOUBLE PRECISION NOT NULL,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    CONSTRAINT unique_portfolio_token UNIQUE (portfolio_id, instrument_token)
-                );
-                """
-            )
-        )
-
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS transactions (
-                    id SERIAL PRIMARY KEY,
-                    portfolio_id INTEGER NOT NULL REFERENCES portfolios(id),
-                    instrument_token BIGINT NOT NULL REFERENCES stock_master(instrument_token),
-                    symbol TEXT NOT NULL,
-                    type TEXT NOT NULL CHECK (type IN ('BUY', 'SELL')),
-                    quantity INTEGER NOT NULL,
-                    price DOUBLE PRECISION NOT NULL,
-                    amount DOUBLE PRECISION NOT NULL,
-                    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                );
-                """
-            )
-        )
-        
-        # Create watchlists table
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS watchlists (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER NOT NULL REFERENCES users(id),
-                    instrument_token BIGINT NOT NULL,
-                    symbol TEXT NOT NULL,
-                    added_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    CONSTRAINT unique_user_watchlist UNIQUE (user_id, instrument_token)
-                );
-                """
-            )
-        )
-        
-        # Create notifications table
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS notifications (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER NOT NULL REFERENCES users(id),
-                    type TEXT NOT NULL CHECK (type IN ('alert', 'system', 'score_change')),
-                    title TEXT NOT NULL,
-                    message TEXT,
-                    is_read BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                );
-                """
-            )
-        )
-        
-        # Create user_alert_preferences table
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS user_alert_preferences (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER NOT NULL REFERENCES users(id) UNIQUE,
-                    email_alerts BOOLEAN DEFAULT TRUE,
-                    push_alerts BOOLEAN DEFAULT TRUE,
-                    score_threshold INTEGER DEFAULT 70,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                );
-                """
-            )
-        )
-
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS stock_orders (
-                    id SERIAL PRIMARY KEY,
-                    portfolio_id INTEGER NOT NULL REFERENCES portfolios(id),
-                    instrument_token BIGINT NOT NULL,
-                    symbol TEXT NOT NULL,
-                    quantity INTEGER NOT NULL,
-                    action TEXT NOT NULL CHECK (action IN ('BUY', 'SELL')),
-                    order_type TEXT NOT NULL CHECK (order_type IN ('MARKET', 'LIMIT', 'STOP')),
-                    limit_price DOUBLE PRECISION,
-                    status TEXT DEFAULT 'PENDING' CHECK (status IN ('PENDING', 'EXECUTED', 'CANCELLED', 'REJECTED')),
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    executed_at TIMESTAMPTZ
-                );
-                """
-            )
-        )
-
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS price_alerts (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER NOT NULL REFERENCES users(id),
-                    instrument_token BIGINT,
-                    symbol TEXT NOT NULL,
-                    target_price DOUBLE PRECISION NOT NULL,
-                    condition TEXT NOT NULL CHECK (condition IN ('ABOVE', 'BELOW')),
-                    is_active BOOLEAN DEFAULT TRUE,
-                    triggered_at TIMESTAMPTZ,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                );
-                """
-            )
-        )
-        
-        # Create learning_modules table
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS learning_modules (
-                    id SERIAL PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    category TEXT NOT NULL,
-                    read_time TEXT,
-                    description TEXT,
-                    level TEXT CHECK (level IN ('Beginner', 'Intermediate', 'Advanced')),
-                    content TEXT,
-                    display_order INTEGER DEFAULT 0,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                );
-                """
-            )
-        )
-        
-        # Add index for user subscriptions lookup
+
+        # Hot account lookups: case-insensitive email resolution, the
+        # pending-queue counts (partial index keeps both COUNTs index-only
+        # scans), and active-waitlist email checks. The watchlists
+        # (user_id, instrument_token) pair is already covered by its UNIQUE
+        # constraint.
         try:
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_user_subscriptions_user_id 
-                ON user_subscriptions(user_id);
+                CREATE INDEX IF NOT EXISTS idx_users_email_lower
+                ON users (lower(email));
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_users_pending_queue
+                ON users (approval_status, queue_position)
+                WHERE approval_status = 'pending';
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_waitlist_email_active
+                ON waitlist (email)
+                WHERE converted_to_user = FALSE;
             """))
         except Exception:
             pass
-        
-        conn.execute(
-            text(
-                """
-                CREATE TABLE IF NOT EXISTS stock_history (
-                  instrument_token BIGINT NOT NULL,
-                  ts TIMESTAMPTZ NOT NULL,
-                  interval TEXT NOT NULL,
-                  open DOUBLE PRECISION,
-                  high DOUBLE PRECISION,
-                  low DOUBLE PRECISION,
-                  close DOUBLE PRECISION,
-                  volume DOUBLE PRECISION,
-                  oi DOUBLE PRECISION,
-                  log_return DOUBLE PRECISION,
-                  rsi_14 DOUBLE PRECISION,
-                  ema_50_div DOUBLE PRECISION,
-                  atr_14_norm DOUBLE PRECISION,
-                  rvol DOUBLE PRECISION,
-                  pattern_doji SMALLINT,
-                  pattern_hammer SMALLINT,
-                  pattern_engulfing SMALLINT,
-                  pattern_morning_star SMALLINT,
-                  pattern_shooting_star SMALLINT,
-                  ema_200_div DOUBLE PRECISION,
-                  target_3d SMALLINT,
-                  news_sentiment DOUBLE PRECISION,
-                  CONSTRAINT stock_history_pk PRIMARY KEY (instrument_token, ts, interval)
-                );
-                """
-            )
-        )
+
         feature_cols = [
             ("log_return", "DOUBLE PRECISION"),
             ("rsi_14", "DOUBLE PRECISION"),
@@ -341,12 +382,60 @@ def init_db(engine: Engine) -> None:
 
         try:
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_stock_history_lookup 
+                CREATE INDEX IF NOT EXISTS idx_stock_history_lookup
                 ON stock_history(instrument_token, interval, ts DESC);
             """))
         except Exception:
             pass
 
+        # Covering partial indexes for the hot daily-candle probes
+        # (ticker/volatile/indicator LATERAL subqueries): INCLUDE makes the
+        # latest-close lookups index-only scans with no heap fetch.
+        try:
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_hist_token_day_ts
+                ON stock_history (instrument_token, ts DESC)
+                INCLUDE (close, log_return)
+                WHERE interval = 'day';
+            """))
+        except Exception:
+            pass
+        try:
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_hist_token_day_ts_indicators
+                ON stock_history (instrument_token, ts DESC)
+                INCLUDE (close, log_return)
+                WHERE interval = 'day' AND rsi_14 IS NOT NULL;
+            """))
+        except Exception:
+            pass
+
+    # Trigram indexes let the leading-wildcard ILIKE in search_stocks use
+    # a GIN scan instead of seq-scanning stock_master.
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm;"))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_stock_master_symbol_trgm
+                ON stock_master USING GIN (tradingsymbol gin_trgm_ops);
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_stock_master_name_trgm
+                ON stock_master USING GIN (name gin_trgm_ops);
+            """))
+    except Exception:
+        pass
+
+    # predictions is created by the external ML pipeline and usually
+    # doesn't exist yet on first migration, so this is best-effort here;
+    # refresh_latest_predictions retries it on every nightly run, which is
+    # what actually creates the view once predictions appears (the version
+    # sentinel means init_db never comes back this way).
+    try:
+        ensure_latest_predictions(engine)
+    except Exception:
+        pass
+
     try:
         with engine.begin() as conn:
             conn.execute(
@@ -358,3 +447,26 @@ def init_db(engine: Engine) -> None:
             )
     except Exception:
         pass
+
+    # Hypertable tuning: daily bars over 10+ years would explode into
+    # hundreds of default 7-day chunks, so widen them, and compress cold
+    # chunks segmented by token so the analytical scans that feed features
+    # read far fewer bytes. Separate try/except per the Timescale-optional
+    # convention above.
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("SELECT set_chunk_time_interval('stock_history', INTERVAL '90 days');"))
+    except Exception:
+        pass
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("""
+                ALTER TABLE stock_history SET (
+                    timescaledb.compress,
+                    timescaledb.compress_segmentby = 'instrument_token, interval',
+                    timescaledb.compress_orderby = 'ts DESC'
+                );
+            """))
+            conn.execute(text("SELECT add_compression_policy('stock_history', INTERVAL '30 days', if_not_exists => TRUE);"))
+    except Exception:
+        pass
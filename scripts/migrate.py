@@ -0,0 +1,30 @@
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Path Setup for Standalone Deployment
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+# Add BASE_DIR to sys.path so we can import ml_engine
+sys.path.append(BASE_DIR)
+
+from ml_engine.db.database import get_engine
+from ml_engine.db.schema import init_db
+
+
+def migrate():
+    """Apply the database schema once, as a pre-deploy step.
+
+    Keeps DDL off the request-serving startup path: run this during
+    deploy and let the web workers start without touching the schema.
+    init_db's version sentinel makes re-runs a single SELECT.
+    """
+    print("Applying database schema...")
+    init_db(get_engine())
+    print("Schema is up to date.")
+
+
+if __name__ == "__main__":
+    migrate()